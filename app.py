@@ -1,14 +1,21 @@
 import os
-import json
-import csv
-from datetime import datetime, date
+import re
+import hashlib
+import hmac
+import secrets
+import time
+from datetime import datetime, date, timedelta
 from collections import Counter
 from io import BytesIO
 
+import numpy as np
+import orjson
 import pandas as pd
 import streamlit as st
-from openpyxl import Workbook
-import matplotlib.pyplot as plt
+import extra_streamlit_components as stx
+
+from page_header import header_html
+from vin_data import load_vin_data, vin_rows
 
 
 # ---------------------------------------------------------
@@ -22,14 +29,25 @@ IMAGES_DIR = os.path.join(BASE_DIR, "images")
 LOGO_PATH = os.path.join(IMAGES_DIR, "me.png")
 AH_LOGO_PATH = os.path.join(IMAGES_DIR, "ah.png")
 
-ORG_FILE = "Organizations.xlsx"
-ORG_SHEET = "Organizations"
+# kolone AH zapisa koje se prikazuju i izvoze u Excel
+AH_COLUMNS = ["user_id", "organization_id", "organization_name", "query_vin", "time_stamp"]
+
+# kolone AH CSV exporta (log*.csv) koje se koriste
+AH_CSV_COLUMNS = ["vin", "order_date", "organisation", "order_client"]
 
 
 # =========================================================
 # 1) AH STATISTIKA PORTAL – POMOĆNE FUNKCIJE
 # =========================================================
 
+# oblici za brzi put kroz fromisoformat: YYYY-MM-DDTHH:MM:SS[±hhmm|Z];
+# sve ostalo ide kroz strptime kao prije
+TS_FAST_RE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:[+-]\d{4}|Z)?")
+
+# "+0000" -> "+00:00", da fromisoformat radi i na Pythonu < 3.11
+TZ_OFFSET_RE = re.compile(r"([+-]\d{2})(\d{2})$")
+
+
 def parse_timestamp(ts_str: str) -> datetime:
     """
     Parsiranje time_stamp stringa u datetime.
@@ -40,6 +58,16 @@ def parse_timestamp(ts_str: str) -> datetime:
     """
     ts_str = (ts_str or "").strip()
 
+    # 0) brzi put – fromisoformat je u C-u i ne isprobava formate; samo za
+    # dokumentirane oblike, da ne prihvati ono što strptime odbija
+    if TS_FAST_RE.fullmatch(ts_str):
+        if ts_str.endswith("Z"):
+            ts_str = ts_str[:-1] + "+00:00"
+        try:
+            return datetime.fromisoformat(TZ_OFFSET_RE.sub(r"\1:\2", ts_str))
+        except ValueError:
+            pass
+
     # 1) kompletan format s offsetom
     try:
         return datetime.strptime(ts_str, "%Y-%m-%dT%H:%M:%S%z")
@@ -62,7 +90,12 @@ def parse_timestamp(ts_str: str) -> datetime:
     raise ValueError(f"Ne mogu parsirati time_stamp: {ts_str}")
 
 
+@st.cache_data(show_spinner=False, ttl=60)
 def list_data_files():
+    """
+    Imena JSON/CSV datoteka u data/. Lista se osvježava najkasnije svakih 60 s,
+    a ne na svakom rerunu.
+    """
     files = []
     if os.path.isdir(DATA_DIR):
         for fname in sorted(os.listdir(DATA_DIR)):
@@ -72,7 +105,7 @@ def list_data_files():
             ext = os.path.splitext(fname)[1].lower()
             if ext in (".json", ".csv"):
                 files.append(fname)
-    return files
+    return tuple(files)
 
 
 @st.cache_data(show_spinner="Učitavanje podataka iz data/ foldera (AH statistika)...")
@@ -98,8 +131,8 @@ def load_ah_data(selected_files):
     def load_json(path: str):
         nonlocal data, org_id_to_name
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                arr = json.load(f)
+            with open(path, "rb") as f:
+                arr = orjson.loads(f.read())
         except Exception as e:
             st.warning(f"Ne mogu učitati JSON datoteku {os.path.basename(path)}: {e}")
             return
@@ -127,40 +160,49 @@ def load_ah_data(selected_files):
             data.append(rec)
 
     def load_csv(path: str):
-        nonlocal data, org_id_to_name
+        nonlocal data
         try:
-            with open(path, "r", encoding="cp1250", newline="") as f:
-                reader = csv.DictReader(f, delimiter=";")
-                for row in reader:
-                    vin = (row.get("vin") or "").strip()
-                    order_date = (row.get("order_date") or "").strip()
-                    org_id = (row.get("organisation") or "").strip()
-                    user_id = (row.get("order_client") or "").strip()
-
-                    if not vin or not order_date:
-                        continue
-
-                    try:
-                        dt = datetime.strptime(order_date, "%Y-%m-%d %H:%M:%S")
-                        d = dt.date()
-                        update_min_max(d)
-                        time_stamp = dt.strftime("%Y-%m-%dT%H:%M:%S+0000")
-                    except ValueError:
-                        continue
-
-                    org_name = org_id_to_name.get(org_id, org_id)
-
-                    rec = {
-                        "user_id": user_id,
-                        "organization_id": org_id,
-                        "organization_name": org_name,
-                        "query_vin": vin,
-                        "time_stamp": time_stamp,
-                        "response_type": None,
-                    }
-                    data.append(rec)
+            df = pd.read_csv(
+                path,
+                sep=";",
+                encoding="cp1250",
+                dtype=str,
+                keep_default_na=False,
+                usecols=lambda col: col in AH_CSV_COLUMNS,
+                # redak s viškom polja preskače se, ne odbacuje cijelu datoteku
+                on_bad_lines="skip",
+            )
         except Exception as e:
             st.warning(f"Ne mogu učitati CSV datoteku {os.path.basename(path)}: {e}")
+            return
+
+        df = df.reindex(columns=AH_CSV_COLUMNS).fillna("")
+        for col in AH_CSV_COLUMNS:
+            df[col] = df[col].str.strip()
+        df = df[(df["vin"] != "") & (df["order_date"] != "")]
+
+        # parsiranje cijele kolone odjednom umjesto strptime po retku
+        ts = pd.to_datetime(df["order_date"], format="%Y-%m-%d %H:%M:%S", errors="coerce")
+        valid = ts.notna()
+        df, ts = df[valid], ts[valid]
+        if df.empty:
+            return
+
+        update_min_max(ts.min().date())
+        update_min_max(ts.max().date())
+
+        org_ids = df["organisation"]
+        records = pd.DataFrame(
+            {
+                "user_id": df["order_client"],
+                "organization_id": org_ids,
+                "organization_name": org_ids.map(org_id_to_name).fillna(org_ids),
+                "query_vin": df["vin"],
+                "time_stamp": ts.dt.strftime("%Y-%m-%dT%H:%M:%S+0000"),
+                "response_type": None,
+            }
+        )
+        data.extend(records.to_dict("records"))
 
     # Prođi kroz sve datoteke u data/
     for fname in sorted(selected_files):
@@ -185,111 +227,121 @@ def load_ah_data(selected_files):
     return data, org_names, min_date, max_date
 
 
-def calculate_stats(data, org_name, d_from: date, d_to: date):
+@st.cache_data(show_spinner=False)
+def load_ah_frame(selected_files):
     """
-    Logika filtriranja AH statistike.
+    Isti zapisi kao load_ah_data, ali kao DataFrame za vektorski izračun.
+    Gradi se tek kad korisnik zatraži rezultat.
     """
-    unique_records = {}
-    per_day = Counter()
-    vin_counter = Counter()
+    data = load_ah_data(selected_files)[0]
+
+    # dtype=object: vrijednosti ostaju kako su učitane (npr. numerički id s
+    # prazninom ne postaje float 1.0)
+    df_ah = pd.DataFrame(data, columns=AH_COLUMNS, dtype=object)
+    # _d je datum kako je zapisan u time_stamp (kao parse_timestamp(...).date())
+    df_ah["_d"] = pd.to_datetime(
+        df_ah["time_stamp"].str.slice(0, 10), format="%Y-%m-%d", errors="coerce"
+    )
+    return df_ah
 
-    for item in data:
-        # filter organizacije
-        if org_name and item.get("organization_name") != org_name:
-            continue
 
-        ts_str = item.get("time_stamp")
-        if not ts_str:
-            continue
+def calculate_stats(df_ah, org_name, d_from: date, d_to: date):
+    """
+    Logika filtriranja AH statistike (vektorski nad DataFrameom iz load_ah_data).
+    """
+    mask = df_ah["_d"].between(pd.Timestamp(d_from), pd.Timestamp(d_to))
+    if org_name:
+        mask &= df_ah["organization_name"] == org_name
 
-        try:
-            ts = parse_timestamp(ts_str)
-        except ValueError:
-            continue
+    # jedinstveni upiti po (VIN, time_stamp); prvi zapis ostaje, kao prije s dictom
+    sub = df_ah[mask].drop_duplicates(subset=["query_vin", "time_stamp"], keep="first")
 
-        d = ts.date()
-        if not (d_from <= d <= d_to):
-            continue
+    rows = sub[AH_COLUMNS].astype(object)
+    export_rows = rows.where(rows.notna(), None).to_dict("records")
 
-        qvin = item.get("query_vin")
-        key = (qvin, ts_str)
+    # statistika po danu – bincount nad rednim brojem dana
+    per_day = Counter()
+    days = sub["_d"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    if len(days):
+        first_day = days.min()
+        day_counts = np.bincount(days - first_day)
+        nonzero = np.flatnonzero(day_counts)
+        dates = (first_day + nonzero).astype("datetime64[D]").tolist()
+        per_day.update(dict(zip(dates, day_counts[nonzero].tolist())))
+
+    # statistika po VIN-u – kodovi po redu pojavljivanja pa bincount;
+    # stabilni sort daje isti poredak kao Counter.most_common kod jednakih brojeva
+    vins = sub["query_vin"]
+    codes, uniques = pd.factorize(vins[vins.notna() & (vins != "")])
+    vin_counts = np.bincount(codes, minlength=len(uniques))
+    top_vins = [
+        (uniques[i], int(vin_counts[i]))
+        for i in np.argsort(-vin_counts, kind="stable")[:5]
+    ]
 
-        if key not in unique_records:
-            row = {
-                "user_id": item.get("user_id"),
-                "organization_id": item.get("organization_id"),
-                "organization_name": item.get("organization_name"),
-                "query_vin": item.get("query_vin"),
-                "time_stamp": item.get("time_stamp"),
-            }
-            unique_records[key] = row
+    return export_rows, per_day, top_vins
 
-            # statistika po danu
-            per_day[d] += 1
 
-            # statistika po VIN-u
-            if qvin:
-                vin_counter[qvin] += 1
+# datumi su slobodni unosi pa gotovo svaka promjena filtera daje novi ključ;
+# cache rezultata je ograničen brojem unosa i trajanjem (zapis ima ~10 MB)
+STATS_CACHE_MAX_ENTRIES = 16
+STATS_CACHE_TTL = 3600
 
-    export_rows = list(unique_records.values())
-    top_vins = vin_counter.most_common(5)
 
-    return export_rows, per_day, top_vins
+@st.cache_data(
+    show_spinner="Izračun statistike...",
+    max_entries=STATS_CACHE_MAX_ENTRIES,
+    ttl=STATS_CACHE_TTL,
+)
+def calculate_stats_cached(selected_files, org_name, d_from: date, d_to: date):
+    """
+    calculate_stats nad odabranim bazama, cache po (baze, organizacija, datumi).
+    """
+    return calculate_stats(load_ah_frame(selected_files), org_name, d_from, d_to)
+
+
+@st.cache_data(show_spinner=False, max_entries=STATS_CACHE_MAX_ENTRIES, ttl=STATS_CACHE_TTL)
+def make_excel_bytes_cached(selected_files, org_name, d_from: date, d_to: date):
+    """
+    Excel export za iste kriterije kao calculate_stats_cached.
+    """
+    export_rows = calculate_stats_cached(selected_files, org_name, d_from, d_to)[0]
+    return make_excel_bytes(export_rows)
 
 
 def make_excel_bytes(rows):
     """
     Kreira Excel (u memoriji) iz danih redaka i vraća bytes za download.
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Upiti"
-
-    headers = ["user_id", "organization_id", "organization_name", "query_vin", "time_stamp"]
-    ws.append(headers)
-
-    for r in rows:
-        ws.append(
-            [
-                r.get("user_id"),
-                r.get("organization_id"),
-                r.get("organization_name"),
-                r.get("query_vin"),
-                r.get("time_stamp"),
-            ]
-        )
+    # uvoz tek kad treba: VIN pretraga ga nikad ne koristi
+    import xlsxwriter
 
     buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    return buf.read()
+    wb = xlsxwriter.Workbook(
+        buf,
+        {"in_memory": True, "strings_to_formulas": False, "strings_to_urls": False},
+    )
+    ws = wb.add_worksheet("Upiti")
 
+    # zaglavlje pa stupac po stupac – bez Cell objekta po ćeliji
+    ws.write_row(0, 0, AH_COLUMNS)
+    for col, header in enumerate(AH_COLUMNS):
+        ws.write_column(1, col, [r.get(header) for r in rows])
 
-def render_header_ah():
-    col_left, col_center, col_right = st.columns([1, 3, 1])
-
-    with col_left:
-        if os.path.exists(LOGO_PATH):
-            st.image(LOGO_PATH, use_container_width=True)
-
-    with col_center:
-        st.markdown(
-            """
-            <div style="text-align: center; padding-top: 10px;">
-                <div style="font-size: 28px; font-weight: 700; margin-bottom: 4px;">
-                    MEVA - AH Statistika
-                </div>
-                <div style="font-size: 14px; color: #666;">
-                    Web verzija alata za pregled i analizu upita
-                </div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+    wb.close()
+    return buf.getvalue()
 
-    with col_right:
-        if os.path.exists(AH_LOGO_PATH):
-            st.image(AH_LOGO_PATH, use_container_width=True)
+
+def render_header_ah():
+    st.markdown(
+        header_html(
+            "MEVA - AH Statistika",
+            "Web verzija alata za pregled i analizu upita",
+            LOGO_PATH,
+            AH_LOGO_PATH,
+        ),
+        unsafe_allow_html=True,
+    )
 
 
 def show_ah_stat_portal():
@@ -357,7 +409,9 @@ def show_ah_stat_portal():
     if st.button("🔍 Prikaži rezultat"):
         org_filter = selected_org if selected_org != "(Sve organizacije)" else ""
 
-        export_rows, per_day, top_vins = calculate_stats(data, org_filter, d_from, d_to)
+        export_rows, per_day, top_vins = calculate_stats_cached(
+            tuple(selected_files), org_filter, d_from, d_to
+        )
 
         st.markdown("### Rezultat")
 
@@ -371,7 +425,7 @@ def show_ah_stat_portal():
             st.dataframe(export_rows[:200], use_container_width=True)
 
             # priprema Excel datoteke za download
-            excel_bytes = make_excel_bytes(export_rows)
+            excel_bytes = make_excel_bytes_cached(tuple(selected_files), org_filter, d_from, d_to)
 
             file_name_org = (
                 org_filter.replace(" d.d.", "")
@@ -401,8 +455,15 @@ def show_ah_stat_portal():
             if not per_day and not top_vins:
                 st.info("Nema podataka za prikaz grafova.")
             else:
-                fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(8, 7))
-                plt.tight_layout(pad=3.0)
+                # matplotlib se uvozi tek ovdje (~0.3 s), da start aplikacije
+                # i VIN pretraga ne plaćaju njegov uvoz
+                from matplotlib.figure import Figure
+
+                # Figure bez pyplota: ne ostaje u globalnom registru između rerunova,
+                # a fiksne margine zamjenjuju tight_layout
+                fig = Figure(figsize=(8, 7))
+                ax1, ax2 = fig.subplots(2, 1)
+                fig.subplots_adjust(left=0.2, right=0.95, hspace=0.55, top=0.95, bottom=0.12)
 
                 # 1) Broj upita po danu/mjesecu
                 if per_day:
@@ -459,6 +520,7 @@ def show_ah_stat_portal():
                     ax2.axis("off")
 
                 st.pyplot(fig)
+                fig.clear()
     else:
         st.info("Odaberi kriterije i klikni **'Prikaži rezultat'**.")
 
@@ -467,86 +529,15 @@ def show_ah_stat_portal():
 # 2) MEVA PRETRAGA PO VIN BROJU – POMOĆNE FUNKCIJE
 # =========================================================
 
-@st.cache_data(show_spinner="Učitavanje statistike (VIN)...")
-def load_vin_data():
-    """
-    Učitava sve *_statistika.csv iz data/ + Organizations.xlsx
-    i vraća jedan merged DataFrame.
-    """
-    pattern = os.path.join(DATA_DIR, "*_statistika.csv")
-    files = sorted(glob.glob(pattern))
-
-    if not files:
-        return None, "Nisam našao statističke CSV datoteke u 'data/'"
-
-    frames = []
-
-    for path in files:
-        year = os.path.basename(path).split("_")[0]  # npr. 2018
-
-        try:
-            df = pd.read_csv(path, dtype=str, encoding="utf-8")
-        except Exception as e:
-            return None, f"Problem pri čitanju CSV datoteke {os.path.basename(path)}: {e}"
-
-        if "CUSTOMERID" in df.columns:
-            df["CUSTOMERID"] = df["CUSTOMERID"].astype(str).str.zfill(9)
-        else:
-            return None, f"U datoteci {os.path.basename(path)} nedostaje kolona 'CUSTOMERID'."
-
-        if "MANUFACTURERCODE" in df.columns:
-            df["MANUFACTURERCODE"] = df["MANUFACTURERCODE"].astype(str).str.zfill(2)
-
-        df["YEAR"] = year
-        frames.append(df)
-
-    stat_df = pd.concat(frames, ignore_index=True)
-
-    org_path = os.path.join(DATA_DIR, ORG_FILE)
-    if not os.path.exists(org_path):
-        return None, f"Nisam našao {ORG_FILE} u 'data/'"
-
-    try:
-        org_df = pd.read_excel(org_path, sheet_name=ORG_SHEET, dtype=str)
-    except Exception as e:
-        return None, f"Problem pri čitanju {ORG_FILE}: {e}"
-
-    if "CODE" not in org_df.columns:
-        return None, f"U {ORG_FILE} nedostaje kolona 'CODE'."
-
-    org_df["CODE"] = org_df["CODE"].astype(str).str.zfill(9)
-    org_df = org_df.rename(columns={"CODE": "CUSTOMERID"})
-
-    full_df = stat_df.merge(org_df, on="CUSTOMERID", how="left")
-    return full_df, None
-
-
 def render_header_vin():
-    col_left, col_center, col_right = st.columns([1, 3, 1])
-
-    with col_left:
-        if os.path.exists(LOGO_PATH):
-            st.image(LOGO_PATH, use_container_width=True)
-        else:
-            st.write("")
-
-    with col_center:
-        st.markdown(
-            """
-            <div style="text-align: center; padding-top: 10px;">
-                <div style="font-size: 28px; font-weight: 700; margin-bottom: 4px;">
-                    MEVA - Pretraga VIN brojeva
-                </div>
-                <div style="font-size: 14px; color: #666;">
-                    Web verzija alata za pregled kalkulacija po VIN broju
-                </div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-
-    with col_right:
-        st.write("")
+    st.markdown(
+        header_html(
+            "MEVA - Pretraga VIN brojeva",
+            "Web verzija alata za pregled kalkulacija po VIN broju",
+            LOGO_PATH,
+        ),
+        unsafe_allow_html=True,
+    )
 
 
 def show_vin_search():
@@ -593,7 +584,7 @@ def show_vin_search():
         unsafe_allow_html=True,
     )
 
-    df, err = load_vin_data()
+    df, vin_index, err = load_vin_data()
     if err:
         st.error(err)
         st.stop()
@@ -640,8 +631,8 @@ def show_vin_search():
             st.error("U podacima ne postoji kolona 'VINNUMBER'.")
             st.stop()
 
-        mask = df["VINNUMBER"].fillna("").str.upper() == vin_query
-        results = df[mask].copy()
+        results = df.iloc[vin_rows(vin_index, vin_query)]
+        results = results.drop(columns=["VINNUMBER_UP"])
 
         if results.empty:
             st.info(f"Nema rezultata za VIN: **{vin_query}**")
@@ -659,17 +650,10 @@ def show_vin_search():
         st.metric("Broj pronađenih zapisa", len(results))
 
         if "YEAR" in results.columns:
-            years = list(results["YEAR"].dropna().unique())
-            years.sort()
-
-            for year in years:
-                sub = results[results["YEAR"] == year].copy()
+            # jedan groupby prolaz; observed=True preskače godine bez rezultata
+            for year, sub in results.groupby("YEAR", sort=True, observed=True):
                 st.markdown(f"#### Godina {year}")
-
-                if "YEAR" in sub.columns:
-                    sub = sub.drop(columns=["YEAR"])
-
-                st.dataframe(sub, use_container_width=True)
+                st.dataframe(sub.drop(columns=["YEAR"]), use_container_width=True)
         else:
             st.dataframe(results, use_container_width=True)
     else:
@@ -680,56 +664,160 @@ def show_vin_search():
 # AUTH / LOGIN
 # =========================================================
 
-def check_password():
-    """Jednostavna login forma, vraća True ako je korisnik ulogiran."""
+# zadane vjerodajnice kad u secrets nisu postavljene obje vrijednosti
+_DEFAULT_USER = b"admin"
+_DEFAULT_PW = b"admin"
 
-    if st.session_state.get("authenticated"):
-        return True
 
+AUTH_COOKIE = "meva_auth"
+AUTH_COOKIE_TTL = timedelta(hours=8)
+# minimalno trajanje provjere prijave (s), skriva preostale razlike u vremenu
+AUTH_MIN_SECONDS = 0.05
+
+
+@st.cache_resource(show_spinner=False)
+def _effective_creds() -> tuple[bytes, bytes, bytes]:
+    """Efektivne vjerodajnice: (sažetak imena, sažetak lozinke, ključ cookieja).
+
+    Jedno čitanje secrets po procesu (cache_resource, bez serijalizacije po
+    sesiji). Zadane vjerodajnice vrijede ako nisu postavljena oba polja.
+    Ključ cookieja je auth.cookie_key; ako nije postavljen, slučajan je po
+    procesu (cookieji tada vrijede do restarta aplikacije).
+    """
     auth_conf = st.secrets.get("auth", {})
     valid_username = auth_conf.get("username")
     valid_password = auth_conf.get("password")
 
-    if not valid_username or not valid_password:
-        valid_username = "admin"
-        valid_password = "admin"
+    if valid_username and valid_password:
+        user_b = valid_username.encode("utf8")
+        pw_b = valid_password.encode("utf8")
+    else:
+        user_b, pw_b = _DEFAULT_USER, _DEFAULT_PW
+
+    user_hash = hashlib.sha256(user_b).digest()
+    pw_hash = hashlib.sha256(pw_b).digest()
+
+    # ključ se ne izvodi iz vjerodajnica: iz uhvaćenog cookieja bi se inače
+    # mogla offline pogađati lozinka (a uz admin/admin i krivotvoriti cookie)
+    cookie_key = auth_conf.get("cookie_key")
+    if cookie_key:
+        cookie_key = cookie_key.encode("utf8")
+    else:
+        cookie_key = secrets.token_bytes(32)
+
+    return user_hash, pw_hash, cookie_key
+
+
+def sign_auth_token(nonce, exp):
+    return hmac.new(_effective_creds()[2], f"{nonce}.{exp}".encode("utf8"), hashlib.sha256).hexdigest()
 
-    st.markdown("### 🔐 Prijava")
 
-    username = st.text_input("Korisničko ime")
-    password = st.text_input("Lozinka", type="password")
-    login_btn = st.button("Prijavi se")
+def make_auth_token():
+    """Token oblika nonce.exp.potpis; exp je unix vrijeme isteka."""
+    nonce = os.urandom(16).hex()
+    exp = int((datetime.now() + AUTH_COOKIE_TTL).timestamp())
+    return f"{nonce}.{exp}.{sign_auth_token(nonce, exp)}"
+
+
+def auth_token_valid(token):
+    """True ako token ima ispravan potpis i još nije istekao."""
+    try:
+        nonce, exp, sig = token.split(".")
+        exp_ts = int(exp)
+    except (AttributeError, ValueError):
+        return False
+    sig_ok = hmac.compare_digest(sig.encode("utf8"), sign_auth_token(nonce, exp).encode("utf8"))
+    return sig_ok and exp_ts > datetime.now().timestamp()
+
+
+@st.fragment
+def _login_form():
+    """Forma za prijavu; kao fragment se na submit izvrti samo ona, ne cijela aplikacija."""
+    st.header("🔐 Prijava", divider=False)
+
+    # forma šalje sva polja odjednom: jedan rerun na "Prijavi se" ili Enter
+    # u polju, umjesto reruna nakon svake promjene polja
+    with st.form("login_form", clear_on_submit=False, enter_to_submit=True):
+        username = st.text_input("Korisničko ime")
+        password = st.text_input("Lozinka", type="password")
+        login_btn = st.form_submit_button("Prijavi se")
 
     if login_btn:
-        if username == valid_username and password == valid_password:
+        t0 = time.perf_counter()
+        # uspoređuju se 32-bajtni sažeci: compare_digest ne prekida na prvom
+        # različitom bajtu, a & (za razliku od and) uvijek izvrši obje
+        # usporedbe, pa se po trajanju ne vidi je li ime ispravno.
+        user_hash, pw_hash, _ = _effective_creds()
+        u_in = hashlib.sha256(username.encode("utf8")).digest()
+        p_in = hashlib.sha256(password.encode("utf8")).digest()
+        ok = bool(hmac.compare_digest(u_in, user_hash) & hmac.compare_digest(p_in, pw_hash))
+        # odluka se uvijek vrati nakon istog minimalnog vremena, bez obzira na ishod
+        time.sleep(max(0.0, AUTH_MIN_SECONDS - (time.perf_counter() - t0)))
+        if ok:
             st.session_state["authenticated"] = True
-            st.success("Uspješna prijava.")
+            # cookie se postavlja u sljedećem (punom) prolazu, jer bi ga
+            # st.rerun odmah nakon set() mogao izgubiti
+            st.session_state["_auth_token"] = make_auth_token()
+            # toast ostaje vidljiv i nakon reruna, st.success bi nestao
+            st.toast("Uspješna prijava.")
+            st.rerun(scope="app")
         else:
             st.error("Neispravno korisničko ime ili lozinka.")
 
-    return st.session_state.get("authenticated", False)
+
+def check_password():
+    """Jednostavna login forma, vraća True ako je korisnik ulogiran."""
+
+    if st.session_state.get("authenticated", False):
+        token = st.session_state.pop("_auth_token", None)
+        if token is not None:
+            stx.CookieManager(key="auth_cookies").set(
+                AUTH_COOKIE,
+                token,
+                key="auth_cookie_set",
+                expires_at=datetime.now() + AUTH_COOKIE_TTL,
+                secure=True,
+                same_site="strict",
+            )
+        return True
+
+    # potpisani cookie preživljava refresh stranice: ako je valjan,
+    # preskače se cijela forma
+    cookies = stx.CookieManager(key="auth_cookies")
+    if auth_token_valid(cookies.get(AUTH_COOKIE)):
+        st.session_state["authenticated"] = True
+        return True
+
+    # uspješna prijava u formi radi st.rerun, pa se ovdje dolazi samo bez nje
+    _login_form()
+    return False
 
 
 # =========================================================
 # MAIN
 # =========================================================
 
+# izbornik alata: oznaka -> funkcija koja crta alat
+_TOOLS = (
+    ("AH STATISTIKA PORTAL", show_ah_stat_portal),
+    ("AH PRETRAGA PO BROJU ŠASIJE", show_vin_search),
+)
+_LABELS = tuple(label for label, _ in _TOOLS)
+_DISPATCH = dict(_TOOLS)
+
+
 def main():
-    st.set_page_config(page_title="MEVA - AH alati", layout="wide")
+    # konfiguracija stranice šalje se jednom po sesiji, ne na svakom rerunu
+    if "_cfg_sent" not in st.session_state:
+        st.set_page_config(page_title="MEVA - AH alati", layout="wide")
+        st.session_state["_cfg_sent"] = True
 
     if not check_password():
         st.stop()
 
     st.sidebar.title("📂 Odaberi alat")
-    izbor = st.sidebar.radio(
-        "Izbornik",
-        ["AH STATISTIKA PORTAL", "AH PRETRAGA PO BROJU ŠASIJE"],
-    )
-
-    if izbor == "AH STATISTIKA PORTAL":
-        show_ah_stat_portal()
-    else:
-        show_vin_search()
+    izbor = st.sidebar.selectbox("Izbornik", _LABELS, key="tool_choice")
+    _DISPATCH[izbor]()
 
 
 if __name__ == "__main__":
@@ -1,115 +1,31 @@
 import os
-import glob
-import pandas as pd
 import streamlit as st
 
+from page_header import header_html
+from vin_data import load_vin_data, vin_rows
+
 # ---------------------------------------------------------
 # PUTEVI
 # ---------------------------------------------------------
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(BASE_DIR, "data")
 
 IMAGES_DIR = os.path.join(BASE_DIR, "images")
 LOGO_PATH = os.path.join(IMAGES_DIR, "me.png")
 
-ORG_FILE = "Organizations.xlsx"
-ORG_SHEET = "Organizations"
-
-# ---------------------------------------------------------
-# UČITAVANJE PODATAKA
-# ---------------------------------------------------------
-
-@st.cache_data(show_spinner="Učitavanje statistike...")
-def load_all_data():
-    """
-    Učitava sve *_statistika.csv iz data/ + Organizations.xlsx
-    i vraća jedan merged DataFrame.
-    """
-    pattern = os.path.join(DATA_DIR, "*_statistika.csv")
-    files = sorted(glob.glob(pattern))
-
-    if not files:
-        return None, "Nisam našao statističke CSV datoteke u 'data/'"
-
-    frames = []
-
-    for path in files:
-        year = os.path.basename(path).split("_")[0]  # npr. 2018
-
-        # CSV je puno brži i ne treba sheet_name
-        try:
-            df = pd.read_csv(path, dtype=str, encoding="utf-8")
-        except Exception as e:
-            return None, f"Problem pri čitanju CSV datoteke {os.path.basename(path)}: {e}"
-
-        # normalizacija CUSTOMERID na 9 znamenki (da se može spojiti s CODE)
-        if "CUSTOMERID" in df.columns:
-            df["CUSTOMERID"] = df["CUSTOMERID"].astype(str).str.zfill(9)
-        else:
-            return None, f"U datoteci {os.path.basename(path)} nedostaje kolona 'CUSTOMERID'."
-
-        # normalizacija MANUFACTURERCODE na 2 znamenke
-        if "MANUFACTURERCODE" in df.columns:
-            df["MANUFACTURERCODE"] = df["MANUFACTURERCODE"].astype(str).str.zfill(2)
-
-        df["YEAR"] = year
-        frames.append(df)
-
-    stat_df = pd.concat(frames, ignore_index=True)
-
-    # organizations
-    org_path = os.path.join(DATA_DIR, ORG_FILE)
-    if not os.path.exists(org_path):
-        return None, f"Nisam našao {ORG_FILE} u 'data/'"
-
-    try:
-        org_df = pd.read_excel(org_path, sheet_name=ORG_SHEET, dtype=str)
-    except Exception as e:
-        return None, f"Problem pri čitanju {ORG_FILE}: {e}"
-
-    # normalizacija CODE na 9 znamenki i preimenovanje u CUSTOMERID
-    if "CODE" not in org_df.columns:
-        return None, f"U {ORG_FILE} nedostaje kolona 'CODE'."
-
-    org_df["CODE"] = org_df["CODE"].astype(str).str.zfill(9)
-    org_df = org_df.rename(columns={"CODE": "CUSTOMERID"})
-
-    # merge
-    full_df = stat_df.merge(org_df, on="CUSTOMERID", how="left")
-
-    return full_df, None
-
 # ---------------------------------------------------------
 # UI - HEADER
 # ---------------------------------------------------------
 
 def render_header():
-    col_left, col_center, col_right = st.columns([1, 3, 1])
-
-    with col_left:
-        if os.path.exists(LOGO_PATH):
-            st.image(LOGO_PATH, use_container_width=True)
-        else:
-            st.write("")
-
-    with col_center:
-        st.markdown(
-            """
-            <div style="text-align: center; padding-top: 10px;">
-                <div style="font-size: 28px; font-weight: 700; margin-bottom: 4px;">
-                    MEVA - Pretraga VIN brojeva
-                </div>
-                <div style="font-size: 14px; color: #666;">
-                    Web verzija alata za pregled kalkulacija po VIN broju
-                </div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-
-    with col_right:
-        st.write("")  # za sada prazno, možeš kasnije dodati drugi logo
+    st.markdown(
+        header_html(
+            "MEVA - Pretraga VIN brojeva",
+            "Web verzija alata za pregled kalkulacija po VIN broju",
+            LOGO_PATH,
+        ),
+        unsafe_allow_html=True,
+    )
 
 # ---------------------------------------------------------
 # GLAVNI DIO APLIKACIJE
@@ -169,7 +85,7 @@ def main():
         unsafe_allow_html=True,
     )
 
-    df, err = load_all_data()
+    df, vin_index, err = load_vin_data()
     if err:
         st.error(err)
         st.stop()
@@ -221,8 +137,9 @@ def main():
             st.error("U podacima ne postoji kolona 'VINNUMBER'.")
             st.stop()
 
-        mask = df["VINNUMBER"].fillna("").str.upper() == vin_query
-        results = df[mask].copy()
+        # O(1) lookup u indeksu umjesto skeniranja cijele kolone
+        results = df.iloc[vin_rows(vin_index, vin_query)]
+        results = results.drop(columns=["VINNUMBER_UP"])
 
         if results.empty:
             st.info(f"Nema rezultata za VIN: **{vin_query}**")
@@ -243,17 +160,10 @@ def main():
 
         # grupiranje po godinama - kao blokovi "Godina 2018, 2019..."
         if "YEAR" in results.columns:
-            years = list(results["YEAR"].dropna().unique())
-            years.sort()
-
-            for year in years:
-                sub = results[results["YEAR"] == year].copy()
+            # jedan groupby prolaz; observed=True preskače godine bez rezultata
+            for year, sub in results.groupby("YEAR", sort=True, observed=True):
                 st.markdown(f"#### Godina {year}")
-
-                if "YEAR" in sub.columns:
-                    sub = sub.drop(columns=["YEAR"])
-
-                st.dataframe(sub, use_container_width=True)
+                st.dataframe(sub.drop(columns=["YEAR"]), use_container_width=True)
         else:
             st.dataframe(results, use_container_width=True)
     else:
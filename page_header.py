@@ -0,0 +1,43 @@
+# HTML zaglavlje stranice (naslov + logotipi); zajedničko za app.py i app_stara.py.
+
+import os
+import base64
+import functools
+
+HEADER_HTML = """
+<div style="display: flex; align-items: center;">
+    <div style="flex: 1;">{left}</div>
+    <div style="flex: 3; text-align: center; padding-top: 10px;">
+        <div style="font-size: 28px; font-weight: 700; margin-bottom: 4px;">
+            {title}
+        </div>
+        <div style="font-size: 14px; color: #666;">
+            {subtitle}
+        </div>
+    </div>
+    <div style="flex: 1;">{right}</div>
+</div>
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def logo_img_html(path):
+    """
+    <img> s logom ugrađenim kao data: URI (čita se jednom po procesu).
+    Prazan string ako logo ne postoji.
+    """
+    if not path or not os.path.exists(path):
+        return ""
+    with open(path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode("ascii")
+    return f'<img src="data:image/png;base64,{encoded}" style="width: 100%;">'
+
+
+@functools.lru_cache(maxsize=None)
+def header_html(title, subtitle, left_logo=None, right_logo=None):
+    return HEADER_HTML.format(
+        left=logo_img_html(left_logo),
+        title=title,
+        subtitle=subtitle,
+        right=logo_img_html(right_logo),
+    )
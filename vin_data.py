@@ -0,0 +1,242 @@
+# Učitavanje VIN statistike (*_statistika.csv + Organizations.xlsx) s Parquet
+# cacheom i indeksom po VIN-u; zajedničko za app.py i app_stara.py.
+
+import os
+import glob
+import hashlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import streamlit as st
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+ORG_FILE = "Organizations.xlsx"
+ORG_SHEET = "Organizations"
+
+# kolone statistike s malo različitih vrijednosti, učitavaju se kao category;
+# TSTAMP i CLAIMNUMBER su gotovo jedinstveni pa ostaju stringovi
+STAT_CATEGORY_COLUMNS = (
+    "CUSTOMERID",
+    "STATUS",
+    "CURRENTMEMBERCUSTOMERID",
+    "CURRENTLOGINNAME",
+    "VINNUMBER",
+    "MANUFACTURERCODE",
+    "MODELCODE",
+    "SUBMODELCODE",
+    "YEAR",
+    "VINNUMBER_UP",
+)
+
+# Parquet cache spojenih VIN podataka (isti za obje aplikacije); verziju
+# povećati kad se promijeni oblik DataFramea koji vraća load_vin_data
+VIN_CACHE_PREFIX = "_cache_vin_"
+VIN_CACHE_VERSION = 8
+
+
+def vin_cache_path(source_files):
+    """
+    Putanja Parquet cache datoteke za dane izvorne datoteke.
+    Ključ je (ime, mtime, veličina) svake datoteke, pa svaka promjena
+    izvora daje novu cache datoteku.
+    """
+    sig = repr(
+        (
+            VIN_CACHE_VERSION,
+            sorted(
+                (os.path.basename(f), os.path.getmtime(f), os.path.getsize(f))
+                for f in source_files
+            ),
+        )
+    )
+    digest = hashlib.md5(sig.encode("utf-8")).hexdigest()
+    return os.path.join(DATA_DIR, f"{VIN_CACHE_PREFIX}{digest}.parquet")
+
+
+def write_vin_cache(df, cache_path):
+    """
+    Sprema DataFrame u Parquet cache i briše zastarjele cache datoteke.
+    Piše se u privremenu datoteku pa os.replace, da druga sesija nikad ne
+    otvori napola zapisan cache. Greške se ignoriraju (npr. read-only
+    datotečni sustav na deployu).
+    """
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=DATA_DIR, prefix=VIN_CACHE_PREFIX, suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp_path, engine="pyarrow", compression="zstd", index=False)
+        os.replace(tmp_path, cache_path)
+        tmp_path = None
+        for old_path in glob.glob(os.path.join(DATA_DIR, f"{VIN_CACHE_PREFIX}*.parquet")):
+            if old_path != cache_path:
+                os.remove(old_path)
+    except Exception:
+        pass
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def zfill_ids(values, width):
+    """
+    Nadopunjava ID-eve nulama s lijeva na zadanu širinu (kao str.zfill).
+    Radi nad Arrow nizom (C++), bez Python stringa po retku.
+    """
+    return pc.utf8_lpad(values, width=width, padding="0")
+
+
+def build_vin_index(vins_up):
+    """
+    Indeks za točan match po VIN-u (velika slova): (kategorije, order, offsets).
+    vins_up je categorical kolona VINNUMBER_UP; retci VIN-a s kodom c su
+    order[offsets[c]:offsets[c + 1]]. Dva int niza umjesto Python objekta po VIN-u.
+    """
+    categories = vins_up.cat.categories
+    codes = vins_up.cat.codes.to_numpy()
+    order = np.argsort(codes, kind="stable").astype(np.int64)
+    # +1 jer prazne vrijednosti imaju kod -1; ti retci su na početku i odbacuju se
+    counts = np.bincount(codes + 1, minlength=len(categories) + 1)
+    order = order[counts[0]:]
+    offsets = np.concatenate(([0], np.cumsum(counts[1:])))
+    return categories, order, offsets
+
+
+def vin_rows(vin_index, vin):
+    """Pozicije redaka za VIN (velika slova); prazan niz ako ga nema."""
+    categories, order, offsets = vin_index
+    code = categories.get_indexer([vin])[0]
+    if code < 0:
+        return order[:0]
+    return order[offsets[code]:offsets[code + 1]]
+
+
+def read_stat_csv(path):
+    """
+    Čita *_statistika.csv u Arrow tablicu, sve kolone kao string (kao dtype=str).
+    Imena kolona daje shema prvog bloka, parsiranje cijele datoteke radi pyarrow.
+    """
+    try:
+        with pacsv.open_csv(path) as reader:
+            header = reader.schema.names
+        return pacsv.read_csv(
+            path,
+            read_options=pacsv.ReadOptions(use_threads=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={col: pa.string() for col in header},
+                strings_can_be_null=True,
+            ),
+        )
+    except pa.ArrowInvalid:
+        # neispravan redak (npr. manjak polja) ruši Arrow parser za cijelu
+        # datoteku; pandas takve retke nadopuni NaN-om, kao prije
+        df = pd.read_csv(path, dtype=str, encoding="utf-8")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        return table.cast(pa.schema([(col, pa.string()) for col in table.column_names]))
+
+
+@st.cache_resource(show_spinner="Učitavanje statistike (VIN)...")
+def load_vin_data():
+    """
+    Vraća (DataFrame, VIN indeks, greška).
+
+    cache_resource umjesto cache_data: DataFrame i indeks se dijele između
+    rerunova bez kopiranja (pickle), pa se ne smiju mijenjati na mjestu.
+    """
+    full_df, err = read_vin_data()
+    if err:
+        return None, None, err
+
+    vin_index = build_vin_index(full_df["VINNUMBER_UP"]) if "VINNUMBER_UP" in full_df.columns else None
+    return full_df, vin_index, None
+
+
+def read_vin_data():
+    """
+    Učitava sve *_statistika.csv iz data/ + Organizations.xlsx
+    i vraća jedan merged DataFrame.
+    """
+    pattern = os.path.join(DATA_DIR, "*_statistika.csv")
+    files = sorted(glob.glob(pattern))
+
+    if not files:
+        return None, "Nisam našao statističke CSV datoteke u 'data/'"
+
+    org_path = os.path.join(DATA_DIR, ORG_FILE)
+    if not os.path.exists(org_path):
+        return None, f"Nisam našao {ORG_FILE} u 'data/'"
+
+    cache_path = vin_cache_path(files + [org_path])
+    if os.path.isfile(cache_path):
+        try:
+            return pd.read_parquet(cache_path, engine="pyarrow", memory_map=True), None
+        except Exception:
+            pass  # oštećen cache – ponovno učitaj iz CSV-a
+
+    tables = []
+
+    for path in files:
+        year = os.path.basename(path).split("_")[0]  # npr. 2018
+
+        try:
+            table = read_stat_csv(path)
+        except Exception as e:
+            return None, f"Problem pri čitanju CSV datoteke {os.path.basename(path)}: {e}"
+
+        if "CUSTOMERID" not in table.column_names:
+            return None, f"U datoteci {os.path.basename(path)} nedostaje kolona 'CUSTOMERID'."
+
+        table = table.append_column("YEAR", pa.array([year] * table.num_rows, type=pa.string()))
+        tables.append(table)
+
+    stat_table = pa.concat_tables(tables, promote_options="default")
+
+    for col, width in (("CUSTOMERID", 9), ("MANUFACTURERCODE", 2)):
+        if col in stat_table.column_names:
+            i = stat_table.column_names.index(col)
+            stat_table = stat_table.set_column(i, col, zfill_ids(stat_table[col], width))
+
+    # VIN velikim slovima računa se jednom ovdje, ne kod svake pretrage;
+    # prazni VIN-ovi ostaju null (kod -1) i ne ulaze u indeks
+    if "VINNUMBER" in stat_table.column_names:
+        stat_table = stat_table.append_column("VINNUMBER_UP", pc.utf8_upper(stat_table["VINNUMBER"]))
+
+    # ponavljajuće kolone kao category (manje memorije, brži sort/groupby/join);
+    # kodiranje radi Arrow u istoj konverziji u pandas
+    categories = [col for col in STAT_CATEGORY_COLUMNS if col in stat_table.column_names]
+    stat_df = stat_table.to_pandas(categories=categories)
+
+    try:
+        org_df = pd.read_excel(org_path, sheet_name=ORG_SHEET, dtype=str, engine="calamine")
+    except Exception as e:
+        return None, f"Problem pri čitanju {ORG_FILE}: {e}"
+
+    if "CODE" not in org_df.columns:
+        return None, f"U {ORG_FILE} nedostaje kolona 'CODE'."
+
+    # CODE (9 znamenki) postaje indeks CUSTOMERID, bez preimenovanja kolone
+    org_codes = zfill_ids(pa.array(org_df["CODE"].astype(str)), 9)
+    org_codes = pd.Categorical(org_codes.to_numpy(zero_copy_only=False))
+    # kolone organizacija se nakon joina ponavljaju po retku -> category
+    org_df = org_df.drop(columns=["CODE"]).astype("category")
+
+    # isti categorical tip ključa s obje strane -> join radi nad int kodovima
+    key_type = pd.CategoricalDtype(
+        union_categoricals([stat_df["CUSTOMERID"].values, org_codes]).categories
+    )
+    stat_df["CUSTOMERID"] = stat_df["CUSTOMERID"].astype(key_type)
+    org_df.index = pd.CategoricalIndex(org_codes, dtype=key_type, name="CUSTOMERID")
+
+    full_df = stat_df.join(org_df, on="CUSTOMERID", how="left", sort=False).reset_index(drop=True)
+
+    write_vin_cache(full_df, cache_path)
+    return full_df, None